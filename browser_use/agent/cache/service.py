@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import re
+from pathlib import Path
+from typing import Any, Optional
+
+import orjson
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+
+from browser_use.agent.cache.views import CachedModelOutput
+
+logger = logging.getLogger(__name__)
+
+# the date in the state message changes between runs, but not the state itself
+_CURRENT_DATE_LINE = re.compile(r'^Current date and time: .*$', re.MULTILINE)
+
+
+class PromptCache:
+	"""
+	Reuse model outputs for identical prompts, e.g. when replaying a deterministic run.
+
+	The key is a hash over all input messages (ignoring the current date and trailing
+	whitespace), the model name and the temperature, so a hit never returns an output for a
+	different prompt. Outputs are kept in memory and, if `cache_dir` is set, also persisted as
+	one json file per prompt.
+	"""
+
+	def __init__(self, cache_dir: Optional[str | Path] = None):
+		self.cache_dir = Path(cache_dir) if cache_dir else None
+		self._outputs: dict[str, str] = {}
+		if self.cache_dir:
+			self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+	@staticmethod
+	def make_key(
+		messages: list[BaseMessage],
+		model: Optional[str] = None,
+		temperature: Optional[float] = None,
+	) -> str:
+		prompt = {
+			'messages': [_message_to_dict(m) for m in messages],
+			'model': model,
+			'temperature': temperature,
+		}
+		return hashlib.sha256(
+			orjson.dumps(prompt, default=str, option=orjson.OPT_SORT_KEYS)
+		).hexdigest()
+
+	def get(self, key: str) -> Optional[str]:
+		"""Get the cached output for a prompt key"""
+		if key in self._outputs:
+			return self._outputs[key]
+
+		if self.cache_dir:
+			path = self.cache_dir / f'{key}.json'
+			if path.exists():
+				output = path.read_text(encoding='utf-8')
+				self._outputs[key] = output
+				return output
+
+		return None
+
+	def put(self, key: str, output: str) -> None:
+		"""Store the output the model produced for a prompt key"""
+		self._outputs[key] = output
+		if self.cache_dir:
+			(self.cache_dir / f'{key}.json').write_text(output, encoding='utf-8')
+
+
+class SemanticCache:
+	"""
+	Reuse model outputs for browser states which are (nearly) identical to an earlier one.
+
+	An output is only reused for the same task on the same url. Within those, the state
+	descriptions (ignoring the current date) are compared by the cosine similarity of their
+	embeddings. Outputs stored by
+	the agent run which is looking them up are skipped: replaying its own output would lead to
+	the same state again and the agent would repeat that output until it runs out of steps.
+	"""
+
+	def __init__(
+		self,
+		embeddings: Embeddings,
+		similarity_threshold: float = 0.92,
+		max_entries: int = 1000,
+	):
+		self.embeddings = embeddings
+		self.similarity_threshold = similarity_threshold
+		self.max_entries = max_entries
+		self._entries: list[CachedModelOutput] = []
+		# embedding computed by the last lookup, reused when the output for that state is stored
+		self._last_embedding: Optional[tuple[str, list[float]]] = None
+
+	@staticmethod
+	def make_key(task: str, url: str, state_text: str) -> str:
+		return hashlib.sha256('\n'.join([task, url, state_text]).encode()).hexdigest()
+
+	async def get(
+		self, task: str, url: str, state_text: str, agent_id: Optional[str] = None
+	) -> Optional[str]:
+		"""Get the cached output for a state or None if there is no similar enough state"""
+		candidates = [
+			e
+			for e in self._entries
+			if e.task == task and e.url == url and (agent_id is None or e.agent_id != agent_id)
+		]
+		if not candidates:
+			return None
+
+		state_text = _normalize_text(state_text)
+		key = self.make_key(task, url, state_text)
+		for entry in candidates:
+			if entry.key == key:
+				logger.debug('Semantic cache: exact hit')
+				return entry.output
+
+		embedding = await self._embed(key, state_text)
+		similarity, best = max(
+			((_cosine_similarity(embedding, e.embedding), e) for e in candidates),
+			key=lambda x: x[0],
+		)
+		if similarity < self.similarity_threshold:
+			logger.debug(f'Semantic cache: miss (best similarity {similarity:.3f})')
+			return None
+
+		logger.debug(f'Semantic cache: hit with similarity {similarity:.3f}')
+		return best.output
+
+	async def put(
+		self, task: str, url: str, state_text: str, output: str, agent_id: Optional[str] = None
+	) -> None:
+		"""Store the output the model produced for a state"""
+		state_text = _normalize_text(state_text)
+		key = self.make_key(task, url, state_text)
+		embedding = await self._embed(key, state_text)
+		self._entries.append(
+			CachedModelOutput(
+				task=task, url=url, key=key, embedding=embedding, output=output, agent_id=agent_id
+			)
+		)
+		if len(self._entries) > self.max_entries:
+			self._entries.pop(0)
+
+	async def _embed(self, key: str, text: str) -> list[float]:
+		if self._last_embedding and self._last_embedding[0] == key:
+			return self._last_embedding[1]
+
+		embedding = await self.embeddings.aembed_query(text)
+		self._last_embedding = (key, embedding)
+		return embedding
+
+
+def _cosine_similarity(a: list[float], b: list[float]) -> float:
+	norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+	if norm == 0:
+		return 0.0
+	return sum(x * y for x, y in zip(a, b)) / norm
+
+
+def _normalize_text(text: str) -> str:
+	# trailing whitespace does not change the prompt for the model
+	text = _CURRENT_DATE_LINE.sub('', text)
+	return '\n'.join(line.rstrip() for line in text.rstrip().split('\n'))
+
+
+def _message_to_dict(message: BaseMessage) -> dict[str, Any]:
+	content = message.content
+	if isinstance(content, str):
+		content = _normalize_text(content)
+	else:
+		content = [
+			{**item, 'text': _normalize_text(item['text'])}
+			if isinstance(item, dict) and item.get('type') == 'text'
+			else item
+			for item in content
+		]
+	return {
+		'type': message.type,
+		'content': content,
+		'tool_calls': getattr(message, 'tool_calls', None),
+	}
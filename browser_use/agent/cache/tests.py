@@ -0,0 +1,209 @@
+import hashlib
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from browser_use.agent.cache.service import PromptCache, SemanticCache
+from browser_use.agent.service import Agent
+from browser_use.agent.views import ActionResult, AgentBrain
+from browser_use.browser.views import BrowserState
+from browser_use.controller.service import Controller
+from browser_use.dom.views import DOMElementNode
+
+
+class BagOfWordsEmbedding(Embeddings):
+	"""Texts sharing most of their words get similar embeddings"""
+
+	def embed_documents(self, texts: list[str]) -> list[list[float]]:
+		return [self.embed_query(text) for text in texts]
+
+	def embed_query(self, text: str) -> list[float]:
+		embedding = [0.0] * 256
+		for word in text.split():
+			embedding[int(hashlib.md5(word.encode()).hexdigest(), 16) % 256] += 1.0
+		return embedding
+
+
+@pytest.fixture
+def cache():
+	return SemanticCache(embeddings=DeterministicFakeEmbedding(size=64), max_entries=2)
+
+
+async def test_hit_for_same_state(cache: SemanticCache):
+	await cache.put('task', 'https://example.com', 'state', '{"action": []}')
+
+	assert await cache.get('task', 'https://example.com', 'state') == '{"action": []}'
+
+
+async def test_miss_for_other_url_or_task(cache: SemanticCache):
+	await cache.put('task', 'https://example.com', 'state', '{"action": []}')
+
+	assert await cache.get('task', 'https://other.com', 'state') is None
+	assert await cache.get('other task', 'https://example.com', 'state') is None
+
+
+async def test_miss_for_dissimilar_state(cache: SemanticCache):
+	await cache.put('task', 'https://example.com', 'state', '{"action": []}')
+
+	assert await cache.get('task', 'https://example.com', 'completely different') is None
+
+
+async def test_hit_for_similar_state():
+	cache = SemanticCache(embeddings=BagOfWordsEmbedding(), similarity_threshold=0.9)
+	state = ' '.join(f'[{i}]<button>Item {i}</button>' for i in range(30))
+	await cache.put('task', 'https://example.com', state, '{"action": []}')
+
+	similar = state + ' [30]<button>Item 30</button>'
+	assert await cache.get('task', 'https://example.com', similar) == '{"action": []}'
+	assert await cache.get('task', 'https://example.com', 'login form') is None
+
+
+async def test_miss_for_own_agent_run():
+	cache = SemanticCache(embeddings=BagOfWordsEmbedding())
+	await cache.put('task', 'https://example.com', 'state', '{"action": []}', agent_id='run 1')
+
+	assert await cache.get('task', 'https://example.com', 'state', agent_id='run 1') is None
+	assert await cache.get('task', 'https://example.com', 'state', agent_id='run 2') == (
+		'{"action": []}'
+	)
+
+
+class FakeLLM:
+	"""Structured output LLM which returns a new goal on every call"""
+
+	def __init__(self):
+		self.calls = 0
+
+	def with_structured_output(self, schema, include_raw=False):
+		self.schema = schema
+		return self
+
+	async def ainvoke(self, messages):
+		self.calls += 1
+		brain = AgentBrain(
+			evaluation_previous_goal='Unknown', memory='', next_goal=f'goal {self.calls}'
+		)
+		return {'parsed': self.schema(current_state=brain, action=[])}
+
+
+class FakeBrowserContext:
+	"""Browser context whose page never changes"""
+
+	session = None
+
+	async def get_state(self, use_vision: bool = True) -> BrowserState:
+		return BrowserState(
+			url='https://example.com',
+			title='Example',
+			tabs=[],
+			element_tree=DOMElementNode(
+				tag_name='body', xpath='', attributes={}, children=[], is_visible=True, parent=None
+			),
+			selector_map={},
+		)
+
+
+class FakeController(Controller):
+	async def multi_act(self, actions, browser_context) -> list[ActionResult]:
+		return [ActionResult(extracted_content='Scrolled down', include_in_memory=True)]
+
+
+class FailingEmbedding(Embeddings):
+	def embed_documents(self, texts: list[str]) -> list[list[float]]:
+		raise ConnectionError('embedding provider unavailable')
+
+	def embed_query(self, text: str) -> list[float]:
+		raise ConnectionError('embedding provider unavailable')
+
+
+def make_agent(cache: SemanticCache, llm: FakeLLM) -> Agent:
+	return Agent(
+		task='task',
+		llm=llm,  # type: ignore
+		browser_context=FakeBrowserContext(),  # type: ignore
+		controller=FakeController(),
+		use_vision=False,
+		generate_gif=False,
+		semantic_cache=cache,
+	)
+
+
+@pytest.fixture(autouse=True)
+def disable_telemetry(monkeypatch):
+	monkeypatch.setenv('ANONYMIZED_TELEMETRY', 'false')
+
+
+async def test_agent_does_not_replay_its_own_outputs():
+	cache = SemanticCache(embeddings=BagOfWordsEmbedding())
+
+	llm = FakeLLM()
+	agent = make_agent(cache, llm)
+	for _ in range(4):
+		await agent.step()
+	assert llm.calls == 4
+
+	# a later run on the same task reuses the stored outputs
+	other_llm = FakeLLM()
+	await make_agent(cache, other_llm).step()
+	assert other_llm.calls == 0
+
+
+async def test_agent_exact_hit_from_run_on_other_date():
+	# different strings are never similar - only an exact hit can be reused
+	cache = SemanticCache(embeddings=DeterministicFakeEmbedding(size=64))
+
+	agent = make_agent(cache, FakeLLM())
+	agent.message_manager.time_str = '2025-01-01 10:00'
+	await agent.step()
+
+	other_llm = FakeLLM()
+	other_agent = make_agent(cache, other_llm)
+	other_agent.message_manager.time_str = '2025-02-03 11:30'
+	await other_agent.step()
+	assert other_llm.calls == 0
+
+
+async def test_agent_calls_llm_when_cache_fails():
+	llm = FakeLLM()
+	agent = make_agent(SemanticCache(embeddings=FailingEmbedding()), llm)
+	await agent.step()
+	await agent.step()
+
+	assert llm.calls == 2
+	assert agent.history.errors() == []
+	assert agent.consecutive_failures == 0
+
+
+async def test_oldest_entry_is_evicted(cache: SemanticCache):
+	for i in range(3):
+		await cache.put('task', 'https://example.com', f'state {i}', f'output {i}')
+
+	assert await cache.get('task', 'https://example.com', 'state 0') is None
+	assert await cache.get('task', 'https://example.com', 'state 2') == 'output 2'
+
+
+def test_prompt_cache_key_ignores_current_date():
+	system = SystemMessage(content='system')
+	first = [system, HumanMessage(content='Current date and time: 2025-01-01 10:00\nstate')]
+	second = [system, HumanMessage(content='Current date and time: 2025-02-03 11:30\nstate')]
+	other = [system, HumanMessage(content='other state')]
+
+	assert PromptCache.make_key(first, 'gpt-4o', 0.0) == PromptCache.make_key(second, 'gpt-4o', 0.0)
+	assert PromptCache.make_key(first, 'gpt-4o', 0.0) != PromptCache.make_key(first, 'gpt-4o', 0.7)
+	assert PromptCache.make_key(first, 'gpt-4o', 0.0) != PromptCache.make_key(other, 'gpt-4o', 0.0)
+
+
+def test_prompt_cache_key_ignores_trailing_whitespace():
+	first = [HumanMessage(content='Current url: https://example.com\nstate')]
+	second = [HumanMessage(content='Current url: https://example.com  \nstate\n\n')]
+
+	assert PromptCache.make_key(first) == PromptCache.make_key(second)
+
+
+def test_prompt_cache_persists_to_disk(tmp_path):
+	key = PromptCache.make_key([HumanMessage(content='state')], 'gpt-4o', 0.0)
+	PromptCache(cache_dir=tmp_path).put(key, '{"action": []}')
+
+	assert PromptCache(cache_dir=tmp_path).get(key) == '{"action": []}'
+	assert PromptCache(cache_dir=tmp_path).get('missing') is None
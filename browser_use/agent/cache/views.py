@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CachedModelOutput:
+	"""A model output stored together with the state it was produced for"""
+
+	task: str
+	url: str
+	key: str  # hash of task, url and state description
+	embedding: list[float]
+	output: str  # serialized AgentOutput
+	agent_id: Optional[str] = None  # agent run which produced the output
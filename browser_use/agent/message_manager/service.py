@@ -10,6 +10,7 @@ from langchain_core.messages import (
 	AIMessage,
 	BaseMessage,
 	HumanMessage,
+	SystemMessage,
 )
 from langchain_openai import ChatOpenAI
 
@@ -31,11 +32,16 @@ class MessageManager:
 		max_input_tokens: int = 128000,
 		estimated_tokens_per_character: int = 3,
 		image_tokens: int = 800,
-		include_attributes: list[str] = [],
+		include_attributes: tuple[str, ...] = (),
 		max_error_length: int = 400,
 		max_actions_per_step: int = 10,
 		tool_call_in_content: bool = True,
+		max_elements: Optional[int] = None,
+		compress_screenshots: bool = False,
 	):
+		if max_elements is not None and max_elements < 1:
+			raise ValueError(f'max_elements must be at least 1, got {max_elements}')
+
 		self.llm = llm
 		self.system_prompt_class = system_prompt_class
 		self.max_input_tokens = max_input_tokens
@@ -46,12 +52,18 @@ class MessageManager:
 		self.IMG_TOKENS = image_tokens
 		self.include_attributes = include_attributes
 		self.max_error_length = max_error_length
+		self.max_elements = max_elements
+		self.compress_screenshots = compress_screenshots
+		self.current_date = datetime.now()
+		# formatted once - the date shown to the model is fixed for the whole run
+		self.time_str = self.current_date.strftime('%Y-%m-%d %H:%M')
 
 		system_message = self.system_prompt_class(
 			self.action_descriptions,
-			current_date=datetime.now(),
+			current_date=self.current_date,
 			max_actions_per_step=max_actions_per_step,
 		).get_system_message()
+		system_message = self._with_prompt_caching(system_message)
 
 		self._add_message_with_tokens(system_message)
 		self.system_prompt = system_message
@@ -88,6 +100,22 @@ class MessageManager:
 		task_message = self.task_instructions(task)
 		self._add_message_with_tokens(task_message)
 
+	def _with_prompt_caching(self, system_message: SystemMessage) -> SystemMessage:
+		"""Mark the static system prompt as cacheable for providers which need an explicit marker"""
+		# OpenAI and Gemini cache identical prompt prefixes automatically, Anthropic needs cache_control
+		if not isinstance(self.llm, ChatAnthropic) or not isinstance(system_message.content, str):
+			return system_message
+
+		return SystemMessage(
+			content=[
+				{
+					'type': 'text',
+					'text': system_message.content,
+					'cache_control': {'type': 'ephemeral'},
+				}
+			]
+		)
+
 	@staticmethod
 	def task_instructions(task: str) -> HumanMessage:
 		content = f'Your ultimate task is: {task}. If you achieved your ultimate task, stop everything and use the done action in the next step to complete the task. If not, continue as usual.'
@@ -122,6 +150,9 @@ class MessageManager:
 			include_attributes=self.include_attributes,
 			max_error_length=self.max_error_length,
 			step_info=step_info,
+			time_str=self.time_str,
+			max_elements=self.max_elements,
+			compress_screenshot=self.compress_screenshots,
 		).get_user_message()
 		self._add_message_with_tokens(state_message)
 		
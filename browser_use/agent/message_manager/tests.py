@@ -1,10 +1,14 @@
+import base64
+import io
+
 import pytest
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
+from PIL import Image
 
 from browser_use.agent.message_manager.service import MessageManager
-from browser_use.agent.prompts import SystemPrompt
+from browser_use.agent.prompts import AgentMessagePrompt, SystemPrompt
 from browser_use.agent.views import ActionResult
 from browser_use.browser.views import BrowserState, TabInfo
 from browser_use.dom.views import DOMElementNode, DOMTextNode
@@ -235,4 +239,105 @@ def test_token_overflow_handling_with_real_flow(message_manager: MessageManager,
 		assert message_manager.history.total_tokens == total_tokens
 
 
+@pytest.fixture
+def page_state():
+	"""Page with text and interactive elements, the first button spans two lines"""
+	body = DOMElementNode(
+		tag_name='body', attributes={}, children=[], is_visible=True, parent=None, xpath='//body'
+	)
+	button = DOMElementNode(
+		tag_name='button',
+		attributes={},
+		children=[],
+		is_visible=True,
+		parent=body,
+		xpath='//body/button',
+		highlight_index=0,
+	)
+	button.children = [
+		DOMTextNode(text='Add to', is_visible=True, parent=button),
+		DOMTextNode(text='cart', is_visible=True, parent=button),
+	]
+	link = DOMElementNode(
+		tag_name='a',
+		attributes={},
+		children=[],
+		is_visible=True,
+		parent=body,
+		xpath='//body/a',
+		highlight_index=1,
+	)
+	link.children = [DOMTextNode(text='Next', is_visible=True, parent=link)]
+	body.children = [
+		DOMTextNode(text='Welcome', is_visible=True, parent=body),
+		button,
+		DOMTextNode(text='Footer', is_visible=True, parent=body),
+		link,
+	]
+	return BrowserState(
+		url='https://test.com',
+		title='Test Page',
+		element_tree=body,
+		selector_map={},
+		tabs=[],
+	)
+
+
+def test_max_elements_keeps_interactive_elements(page_state: BrowserState):
+	"""Test that text is dropped before interactive elements and multi-line elements stay whole"""
+	content = AgentMessagePrompt(page_state, max_elements=2).get_user_message().content
+
+	assert '0[:]<button>Add to\ncart</button>\n1[:]<a>Next</a>' in content
+	assert 'Welcome' not in content
+	assert 'Footer' not in content
+	assert '... 2 elements truncated' in content
+
+
+def test_max_elements_keeps_page_order(page_state: BrowserState):
+	"""Test that kept text stays at its position on the page"""
+	content = AgentMessagePrompt(page_state, max_elements=3).get_user_message().content
+
+	assert '_[:]Welcome\n0[:]<button>Add to\ncart</button>\n1[:]<a>Next</a>' in content
+	assert '... 1 elements truncated' in content
+
+
+def test_max_elements_not_reached(page_state: BrowserState):
+	"""Test that no marker is added when all elements fit"""
+	content = AgentMessagePrompt(page_state, max_elements=4).get_user_message().content
+
+	assert '_[:]Footer' in content
+	assert 'truncated' not in content
+
+
+@pytest.mark.parametrize('max_elements', [0, -1])
+def test_max_elements_must_be_positive(page_state: BrowserState, max_elements: int):
+	with pytest.raises(ValueError):
+		AgentMessagePrompt(page_state, max_elements=max_elements)
+
+
+@pytest.fixture
+def screenshot_state(page_state: BrowserState):
+	buffer = io.BytesIO()
+	Image.new('RGB', (1920, 1080), (255, 255, 255)).save(buffer, format='PNG')
+	page_state.screenshot = base64.b64encode(buffer.getvalue()).decode('utf-8')
+	return page_state
+
+
+def test_compressed_screenshot(screenshot_state: BrowserState):
+	"""Test that a compressed screenshot is sent as WebP within 1024px"""
+	prompt = AgentMessagePrompt(screenshot_state, compress_screenshot=True)
+	url = prompt.get_user_message().content[1]['image_url']['url']
+
+	assert url.startswith('data:image/webp;base64,')
+	image = Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1])))
+	assert image.format == 'WEBP'
+	assert max(image.size) <= 1024
+
+
+def test_screenshot_not_compressed_by_default(screenshot_state: BrowserState):
+	content = AgentMessagePrompt(screenshot_state).get_user_message().content
+
+	assert content[1]['image_url']['url'] == f'data:image/png;base64,{screenshot_state.screenshot}'
+
+
 # pytest -s browser_use/agent/message_manager/tests.py
@@ -1,25 +1,25 @@
+import base64
+import io
+import re
 from datetime import datetime
+from functools import lru_cache
 from typing import List, Optional
 
+from jinja2 import Environment
 from langchain_core.messages import HumanMessage, SystemMessage
+from PIL import Image
 
 from browser_use.agent.views import ActionResult, AgentStepInfo
 from browser_use.browser.views import BrowserState
 
+# templates are compiled once at import and rendered with a context per call
+_env = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
 
-class SystemPrompt:
-	def __init__(
-		self, action_description: str, current_date: datetime, max_actions_per_step: int = 10
-	):
-		self.default_action_description = action_description
-		self.current_date = current_date
-		self.max_actions_per_step = max_actions_per_step
+# start of an element line, e.g. "33[:]<button>" or "_[:]text" - element text can span several lines
+_ELEMENT_START = re.compile(r'^(\d+|_)\[:\]')
 
-	def important_rules(self) -> str:
-		"""
-		Returns the important rules for the agent.
-		"""
-		text = """
+# static prompt text - shared by all SystemPrompt instances
+_IMPORTANT_RULES = """
 1. RESPONSE FORMAT: You must ALWAYS respond with valid JSON in this exact format:
    {
      "current_state": {
@@ -94,11 +94,8 @@ class SystemPrompt:
 
 10. Troubleshooting: If you are stuck and an action fails, try to find the reason for the failure and try out a different approach. If you come up with a sequence of actions, and if your sequence is interrupted because of the page changing or something new appearing on the page, then propose an action sequence with only one single action.
 """
-		text += f'   - use maximum {self.max_actions_per_step} actions per sequence'
-		return text
 
-	def input_format(self) -> str:
-		return """
+_INPUT_FORMAT = """
 INPUT STRUCTURE:
 1. Current URL: The webpage you're currently on
 2. Available Tabs: List of open browser tabs
@@ -118,31 +115,78 @@ Notes:
 - _[:] elements provide context but cannot be interacted with
 """
 
-	def get_system_message(self) -> SystemMessage:
-		"""
-		Get the system prompt for the agent.
 
-		Returns:
-		    str: Formatted system prompt
-		"""
-		time_str = self.current_date.strftime('%Y-%m-%d %H:%M')
+@lru_cache(maxsize=None)
+def _important_rules(max_actions_per_step: int) -> str:
+	"""Rules text for a max_actions_per_step, one shared string per value"""
+	return _IMPORTANT_RULES + f'   - use maximum {max_actions_per_step} actions per sequence'
 
-		AGENT_PROMPT = f"""You are a precise browser automation agent that interacts with websites through structured commands. Your role is to:
+
+def _compress_screenshot(screenshot: str, max_size: int = 1024, quality: int = 70) -> str:
+	"""Re-encode a base64 PNG screenshot as downsized base64 WebP"""
+	image = Image.open(io.BytesIO(base64.b64decode(screenshot)))
+	image.thumbnail((max_size, max_size))
+	buffer = io.BytesIO()
+	image.save(buffer, format='WEBP', quality=quality)
+	return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+class SystemPrompt:
+	SYSTEM_TEMPLATE = _env.from_string(
+		"""You are a precise browser automation agent that interacts with websites through structured commands. Your role is to:
 1. Analyze the provided webpage elements and structure
 2. Plan a sequence of actions to accomplish the given task
 3. Respond with valid JSON containing your action sequence and state assessment
 
-Current date and time: {time_str}
-
-{self.input_format()}
+{{ input_format }}
 
-{self.important_rules()}
+{{ important_rules }}
 
 Functions:
-{self.default_action_description}
+{{ action_description }}
 
 Remember: Your responses must be valid JSON matching the specified format. Each action in the sequence must be valid."""
-		return SystemMessage(content=AGENT_PROMPT)
+	)
+
+	def __init__(
+		self, action_description: str, current_date: datetime, max_actions_per_step: int = 10
+	):
+		self.default_action_description = action_description
+		self.current_date = current_date
+		self.max_actions_per_step = max_actions_per_step
+
+		# the system prompt is static for the whole run - build it once.
+		# The current date is sent with the state message instead, so the system prompt stays
+		# byte-identical across steps and runs and can be served from the provider's prompt cache
+		self._system_text = self._build_system_text()
+
+	def important_rules(self) -> str:
+		"""
+		Returns the important rules for the agent.
+		"""
+		return _important_rules(self.max_actions_per_step)
+
+	def input_format(self) -> str:
+		return _INPUT_FORMAT
+
+	def _build_system_text(self) -> str:
+		"""
+		Build the static text of the system prompt.
+		"""
+		return self.SYSTEM_TEMPLATE.render(
+			input_format=self.input_format(),
+			important_rules=self.important_rules(),
+			action_description=self.default_action_description,
+		)
+
+	def get_system_message(self) -> SystemMessage:
+		"""
+		Get the system prompt for the agent.
+
+		Returns:
+		    str: Formatted system prompt
+		"""
+		return SystemMessage(content=self._system_text)
 
 
 # Example:
@@ -152,68 +196,119 @@ Remember: Your responses must be valid JSON matching the specified format. Each
 
 
 class AgentMessagePrompt:
+	STATE_TEMPLATE = _env.from_string(
+		"""
+{% if step_info %}
+Current step: {{ step_info.step_number + 1 }}/{{ step_info.max_steps }}
+{% endif %}
+{% if time_str %}
+Current date and time: {{ time_str }}
+{% endif %}
+Current url: {{ state.url }}
+Available tabs:
+{{ state.tabs }}
+Interactive elements from current page view:
+{% if elements_text %}
+... Cut off - use extract content or scroll to get more ...
+{{ elements_text }}
+{% if truncated_elements %}
+... {{ truncated_elements }} elements truncated - use extract content or scroll to get more ...
+{% endif %}
+... Cut off - use extract content or scroll to get more ...
+{% else %}
+empty page
+{% endif %}
+{% if results %}
+
+{% endif %}
+{% for result in results %}
+{% if result.extracted_content %}
+Action result {{ loop.index }}/{{ loop.length }}: {{ result.extracted_content }}
+{% endif %}
+{% if result.error %}
+{# only use the last max_error_length characters of the error #}
+Action error {{ loop.index }}/{{ loop.length }}: ...{{ result.error[-max_error_length:] }}
+{% endif %}
+{% endfor %}
+"""
+	)
+
 	def __init__(
 		self,
 		state: BrowserState,
 		result: Optional[List[ActionResult]] = None,
-		include_attributes: list[str] = [],
+		include_attributes: tuple[str, ...] = (),
 		max_error_length: int = 400,
 		step_info: Optional[AgentStepInfo] = None,
+		time_str: Optional[str] = None,
+		max_elements: Optional[int] = None,
+		compress_screenshot: bool = False,
 	):
+		if max_elements is not None and max_elements < 1:
+			raise ValueError(f'max_elements must be at least 1, got {max_elements}')
+
 		self.state = state
 		self.result = result
 		self.max_error_length = max_error_length
 		self.include_attributes = include_attributes
 		self.step_info = step_info
+		self.time_str = time_str
+		self.max_elements = max_elements
+		self.compress_screenshot = compress_screenshot
 
-	def get_user_message(self) -> HumanMessage:
-		if self.step_info:
-			step_info_description = (
-				f'Current step: {self.step_info.step_number + 1}/{self.step_info.max_steps}'
-			)
-		else:
-			step_info_description = ''
+	def _truncate_elements(self, elements_text: str) -> tuple[str, int]:
+		"""
+		Keep at most max_elements elements, dropping non-interactive text before interactive elements.
+
+		Returns:
+		    tuple[str, int]: Kept elements in page order and the number of dropped elements
+		"""
+		if self.max_elements is None:
+			return elements_text, 0
+
+		element_lines: list[list[str]] = []
+		for line in elements_text.split('\n'):
+			if element_lines and not _ELEMENT_START.match(line):
+				element_lines[-1].append(line)
+			else:
+				element_lines.append([line])
+		elements = ['\n'.join(lines) for lines in element_lines]
 
+		if len(elements) <= self.max_elements:
+			return elements_text, 0
+
+		interactive = [i for i, element in enumerate(elements) if not element.startswith('_[:]')]
+		text = [i for i, element in enumerate(elements) if element.startswith('_[:]')]
+		keep = sorted((interactive + text)[: self.max_elements])
+		return '\n'.join(elements[i] for i in keep), len(elements) - len(keep)
+
+	def get_user_message(self) -> HumanMessage:
 		elements_text = self.state.element_tree.clickable_elements_to_string(
 			include_attributes=self.include_attributes
 		)
-		if elements_text != '':
-			extra = '... Cut off - use extract content or scroll to get more ...'
-			elements_text = f'{extra}\n{elements_text}\n{extra}'
-		else:
-			elements_text = 'empty page'
-
-		state_description = f"""
-{step_info_description}
-Current url: {self.state.url}
-Available tabs:
-{self.state.tabs}
-Interactive elements from current page view:
-{elements_text}
-"""
-
-		if self.result:
-			for i, result in enumerate(self.result):
-				if result.extracted_content:
-					state_description += (
-						f'\nAction result {i + 1}/{len(self.result)}: {result.extracted_content}'
-					)
-				if result.error:
-					# only use last 300 characters of error
-					error = result.error[-self.max_error_length :]
-					state_description += f'\nAction error {i + 1}/{len(self.result)}: ...{error}'
+		elements_text, truncated_elements = self._truncate_elements(elements_text)
+		state_description = self.STATE_TEMPLATE.render(
+			state=self.state,
+			step_info=self.step_info,
+			time_str=self.time_str,
+			elements_text=elements_text,
+			truncated_elements=truncated_elements,
+			results=self.result or [],
+			max_error_length=self.max_error_length,
+		)
 
 		if self.state.screenshot:
+			if self.compress_screenshot:
+				image_url = f'data:image/webp;base64,{_compress_screenshot(self.state.screenshot)}'
+			else:
+				image_url = f'data:image/png;base64,{self.state.screenshot}'
+
 			# Format message for vision model
 			return HumanMessage(
 				content=[
 					{'type': 'text', 'text': state_description},
-					{
-						'type': 'image_url',
-						'image_url': {'url': f'data:image/png;base64,{self.state.screenshot}'},
-					},
+					{'type': 'image_url', 'image_url': {'url': image_url}},
 				]
 			)
-		
 
 		return HumanMessage(content=state_description)
\ No newline at end of file
@@ -3,7 +3,6 @@ from __future__ import annotations
 import asyncio
 import base64
 import io
-import json
 import logging
 import os
 import platform
@@ -14,6 +13,7 @@ from io import BytesIO
 from pathlib import Path
 from typing import Any, Optional, Type, TypeVar, List
 
+import orjson
 from dotenv import load_dotenv
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.messages import (
@@ -24,6 +24,7 @@ from openai import RateLimitError
 from PIL import Image, ImageDraw, ImageFont
 from pydantic import BaseModel, ValidationError
 
+from browser_use.agent.cache.service import PromptCache, SemanticCache
 from browser_use.agent.message_manager.service import MessageManager
 from browser_use.agent.prompts import AgentMessagePrompt, SystemPrompt
 from browser_use.agent.views import (
@@ -74,7 +75,7 @@ class Agent:
 		max_input_tokens: int = 128000,
 		validate_output: bool = False,
 		generate_gif: bool = True,
-		include_attributes: list[str] = [
+		include_attributes: tuple[str, ...] = (
 			'title',
 			'type',
 			'name',
@@ -85,10 +86,16 @@ class Agent:
 			'value',
 			'alt',
 			'aria-expanded',
-		],
+		),
 		max_error_length: int = 400,
 		max_actions_per_step: int = 10,
 		tool_call_in_content: bool = True,
+		semantic_cache: Optional[SemanticCache] = None,
+		prompt_cache: Optional[PromptCache] = None,
+		max_elements: Optional[int] = None,
+		compress_screenshots: bool = False,
+		llm_timeout: Optional[float] = 60,
+		step_timeout: Optional[float] = 180,
 	):
 		self.agent_id = str(uuid.uuid4())  # unique identifier for the agent
 
@@ -104,6 +111,10 @@ class Agent:
 		# Controller setup
 		self.controller = controller
 		self.max_actions_per_step = max_actions_per_step
+		self.semantic_cache = semantic_cache
+		self.prompt_cache = prompt_cache
+		self.llm_timeout = llm_timeout
+		self.step_timeout = step_timeout
 
 		self.current_states : List[AgentMessagePrompt] = []
 
@@ -147,6 +158,8 @@ class Agent:
 			max_error_length=self.max_error_length,
 			max_actions_per_step=self.max_actions_per_step,
 			tool_call_in_content=tool_call_in_content,
+			max_elements=max_elements,
+			compress_screenshots=compress_screenshots,
 		)
 
 		# Tracking variables
@@ -182,18 +195,19 @@ class Agent:
 			self.current_states.append(agent_current_prompt)
 			input_messages = self.message_manager.get_messages()
 			try:
-				model_output = await self.get_next_action(input_messages)
+				model_output = await self.get_next_action(input_messages, state)
 				self._save_conversation(input_messages, model_output)
 				self.message_manager._remove_last_state_message()  # we dont want the whole state in the chat history
 				self.message_manager.add_model_output(model_output)
-			except Exception as e:
-				# model call failed, remove last state message from history
+			except (Exception, asyncio.CancelledError) as e:
+				# model call failed or step timed out, remove last state message from history
 				self.message_manager._remove_last_state_message()
 				raise e
 
 			result: list[ActionResult] = await self.controller.multi_act(
 				model_output.action, self.browser_context
 			)
+			self._trim_errors(result)
 
 			self._last_result = result
 
@@ -221,10 +235,8 @@ class Agent:
 					step_error=[r.error for r in result if r.error] if result else ['No result'],
 				)
 			)
-			if not result:
-				return
-
-			if state:
+			# no return in finally - it would swallow the cancellation of a timed out step
+			if result and state:
 				self._make_history_item(model_output, state, result)
 
 	def _handle_step_error(self, error: Exception) -> list[ActionResult]:
@@ -255,7 +267,16 @@ class Agent:
 			logger.error(f'{prefix}{error_msg}')
 			self.consecutive_failures += 1
 
-		return [ActionResult(error=error_msg, include_in_memory=True)]
+		return self._trim_errors([ActionResult(error=error_msg, include_in_memory=True)])
+
+	def _trim_errors(self, result: list[ActionResult]) -> list[ActionResult]:
+		"""Keep only the end of long errors, so large stack traces are not kept alive in the history"""
+		for r in result:
+			if r.error and len(r.error) > self.max_error_length:
+				# not every error is logged where it is raised - keep the full text in the debug log
+				logger.debug(f'Trimming error to {self.max_error_length} characters: {r.error}')
+				r.error = r.error[-self.max_error_length :]
+		return result
 
 	def _make_history_item(
 		self,
@@ -288,15 +309,63 @@ class Agent:
 		self.history.history.append(history_item)
 
 	@time_execution_async('--get_next_action')
-	async def get_next_action(self, input_messages: list[BaseMessage]) -> AgentOutput:
+	async def get_next_action(
+		self, input_messages: list[BaseMessage], state: Optional[BrowserState] = None
+	) -> AgentOutput:
 		"""Get next action from LLM based on current state"""
+		cache_text = self._get_cache_text(input_messages) if state and self.semantic_cache else None
+		prompt_key = (
+			PromptCache.make_key(
+				input_messages, self._get_model_name(), getattr(self.llm, 'temperature', None)
+			)
+			if self.prompt_cache
+			else None
+		)
 
-		structured_llm = self.llm.with_structured_output(self.AgentOutput, include_raw=True)
-		response: dict[str, Any] = await structured_llm.ainvoke(input_messages)  # type: ignore
+		parsed: AgentOutput | None = None
+		if prompt_key is not None:
+			cached = self.prompt_cache.get(prompt_key)
+			if cached:
+				logger.info('♻️  Reusing cached model output for identical prompt')
+				parsed = self.AgentOutput.model_validate_json(cached)
+
+		if parsed is None and cache_text is not None:
+			try:
+				cached = await self.semantic_cache.get(
+					self.task, state.url, cache_text, agent_id=self.agent_id
+				)
+			except Exception as e:
+				# the cache is only an optimization - a failing embedding call must not fail the step
+				logger.warning(f'Semantic cache lookup failed: {e}')
+				cached = None
+			if cached:
+				logger.info('♻️  Reusing cached model output')
+				parsed = self.AgentOutput.model_validate_json(cached)
 
-		parsed: AgentOutput = response['parsed']
 		if parsed is None:
-			raise ValueError(f'Could not parse response.')
+			structured_llm = self.llm.with_structured_output(self.AgentOutput, include_raw=True)
+			try:
+				response: dict[str, Any] = await asyncio.wait_for(
+					structured_llm.ainvoke(input_messages),  # type: ignore
+					timeout=self.llm_timeout,
+				)
+			except TimeoutError:
+				raise TimeoutError(f'LLM call timed out after {self.llm_timeout} seconds') from None
+
+			parsed = response['parsed']
+			if parsed is None:
+				raise ValueError(f'Could not parse response.')
+
+			output = parsed.model_dump_json(exclude_unset=True)
+			if prompt_key is not None:
+				self.prompt_cache.put(prompt_key, output)
+			if cache_text is not None:
+				try:
+					await self.semantic_cache.put(
+						self.task, state.url, cache_text, output, agent_id=self.agent_id
+					)
+				except Exception as e:
+					logger.warning(f'Semantic cache store failed: {e}')
 
 		# cut the number of actions to max_actions_per_step
 		parsed.action = parsed.action[: self.max_actions_per_step]
@@ -305,6 +374,20 @@ class Agent:
 
 		return parsed
 
+	def _get_cache_text(self, input_messages: list[BaseMessage]) -> str:
+		"""Previous goal and text of the current state message, used to look up cached outputs"""
+		content = input_messages[-1].content
+		if isinstance(content, list):
+			content = '\n'.join(
+				item['text']
+				for item in content
+				if isinstance(item, dict) and item.get('type') == 'text'
+			)
+
+		thoughts = self.history.model_thoughts()
+		previous_goal = thoughts[-1].next_goal if thoughts else ''
+		return f'Previous goal: {previous_goal}\n{content}'
+
 	def _log_response(self, response: AgentOutput) -> None:
 		"""Log the model's response"""
 		if 'Success' in response.current_state.evaluation_previous_goal:
@@ -345,9 +428,9 @@ class Agent:
 						f.write(item['text'].strip() + '\n')
 			elif isinstance(message.content, str):
 				try:
-					content = json.loads(message.content)
-					f.write(json.dumps(content, indent=2) + '\n')
-				except json.JSONDecodeError:
+					content = orjson.loads(message.content)
+					f.write(orjson.dumps(content, option=orjson.OPT_INDENT_2).decode('utf-8') + '\n')
+				except orjson.JSONDecodeError:
 					f.write(message.content.strip() + '\n')
 
 			f.write('\n')
@@ -355,18 +438,20 @@ class Agent:
 	def _write_response_to_file(self, f: Any, response: Any) -> None:
 		"""Write model response to conversation file"""
 		f.write(' RESPONSE\n')
-		f.write(json.dumps(json.loads(response.model_dump_json(exclude_unset=True)), indent=2))
+		f.write(response.model_dump_json(exclude_unset=True, indent=2))
 
-	def _log_agent_run(self) -> None:
-		"""Log the agent run"""
-		logger.info(f'🚀 Starting task: {self.task}')
+	def _get_model_name(self) -> str:
 		# model_name is eiter model or model_name
 		if hasattr(self.llm, 'model_name'):
-			model_name = self.llm.model_name  # type: ignore
+			return self.llm.model_name  # type: ignore
 		elif hasattr(self.llm, 'model'):
-			model_name = self.llm.model  # type: ignore
-		else:
-			model_name = 'Unknown'
+			return self.llm.model  # type: ignore
+		return 'Unknown'
+
+	def _log_agent_run(self) -> None:
+		"""Log the agent run"""
+		logger.info(f'🚀 Starting task: {self.task}')
+		model_name = self._get_model_name()
 
 		try:
 			import pkg_resources
@@ -407,7 +492,24 @@ class Agent:
 				if self._too_many_failures():
 					break
 
-				await self.step()
+				try:
+					await asyncio.wait_for(self.step(), timeout=self.step_timeout)
+				except TimeoutError:
+					error_msg = f'Step timed out after {self.step_timeout} seconds'
+					logger.error(f'❌ {error_msg}')
+					self.consecutive_failures += 1
+					self._last_result = [ActionResult(error=error_msg, include_in_memory=True)]
+					# the cancelled step did not store a history item - add one, so the timeout
+					# is part of the history errors
+					self.history.history.append(
+						AgentHistory(
+							model_output=None,
+							result=self._last_result,
+							state=BrowserStateHistory(
+								url='', title='', tabs=[], interacted_element=[None]
+							),
+						)
+					)
 
 				if self.history.is_done():
 					if (
@@ -469,6 +571,9 @@ class Agent:
 				result=self._last_result,
 				include_attributes=self.include_attributes,
 				max_error_length=self.max_error_length,
+				time_str=self.message_manager.time_str,
+				max_elements=self.message_manager.max_elements,
+				compress_screenshot=self.message_manager.compress_screenshots,
 			)
 			msg = [SystemMessage(content=system_msg), content.get_user_message()]
 		else:
@@ -480,7 +585,15 @@ class Agent:
 			reason: str
 
 		validator = self.llm.with_structured_output(ValidationResult, include_raw=True)
-		response: dict[str, Any] = await validator.ainvoke(msg)  # type: ignore
+		try:
+			response: dict[str, Any] = await asyncio.wait_for(
+				validator.ainvoke(msg),  # type: ignore
+				timeout=self.llm_timeout,
+			)
+		except TimeoutError:
+			# like without a browser session, we can't validate the output
+			logger.warning(f'Validator timed out after {self.llm_timeout} seconds')
+			return True
 		parsed: ValidationResult = response['parsed']
 		is_valid = parsed.is_valid
 		if not is_valid:
@@ -1,5 +1,8 @@
+import asyncio
+
 import pytest
 
+from browser_use.agent.service import Agent
 from browser_use.agent.views import (
 	ActionResult,
 	AgentBrain,
@@ -192,5 +195,87 @@ def test_action_creation(action_registry):
 	assert click_action.model_dump(exclude_none=True) == {'click_element': {'index': 1}}
 
 
+class SlowLLM:
+	"""Structured output LLM which never answers in time"""
+
+	def with_structured_output(self, schema, include_raw=False):
+		return self
+
+	async def ainvoke(self, messages):
+		await asyncio.sleep(10)
+
+
+class RecordingLLM:
+	"""Structured output LLM which accepts every output and records its input"""
+
+	def with_structured_output(self, schema, include_raw=False):
+		self.schema = schema
+		return self
+
+	async def ainvoke(self, messages):
+		self.messages = messages
+		return {'parsed': self.schema(is_valid=True, reason='Looks good')}
+
+
+class FakeBrowserContext:
+	session = True
+
+	def __init__(self, sample_browser_state: BrowserState, delay: float = 0):
+		self.state = sample_browser_state
+		self.delay = delay
+
+	async def get_state(self, use_vision: bool = True) -> BrowserState:
+		await asyncio.sleep(self.delay)
+		return self.state
+
+
+@pytest.fixture
+def make_agent(monkeypatch, sample_browser_state):
+	monkeypatch.setenv('ANONYMIZED_TELEMETRY', 'false')
+
+	def make_agent(get_state_delay: float = 0, llm=None, **kwargs) -> Agent:
+		return Agent(
+			task='task',
+			llm=llm or SlowLLM(),  # type: ignore
+			browser_context=FakeBrowserContext(sample_browser_state, get_state_delay),  # type: ignore
+			use_vision=False,
+			generate_gif=False,
+			**kwargs,
+		)
+
+	return make_agent
+
+
+async def test_llm_timeout(make_agent):
+	agent = make_agent(llm_timeout=0.01)
+	await agent.step()
+
+	assert len(agent.history.errors()) == 1
+	assert 'LLM call timed out after 0.01 seconds' in agent.history.errors()[0]
+
+
+async def test_step_timeout_is_recorded_in_history(make_agent):
+	agent = make_agent(get_state_delay=10, step_timeout=0.01, max_failures=1)
+	history = await agent.run(max_steps=3)
+
+	assert history.errors() == ['Step timed out after 0.01 seconds']
+	assert agent.consecutive_failures == 1
+
+
+async def test_validator_timeout_lets_output_pass(make_agent):
+	agent = make_agent(llm_timeout=0.01)
+
+	assert await agent._validate_output() is True
+
+
+async def test_validator_uses_state_message_options(make_agent):
+	llm = RecordingLLM()
+	agent = make_agent(llm=llm)
+	agent.message_manager.time_str = '2025-01-01 10:00'
+
+	assert await agent._validate_output() is True
+	assert 'Current date and time: 2025-01-01 10:00' in llm.messages[1].content[0]['text']
+
+
 # run this with:
 # pytest browser_use/agent/tests.py
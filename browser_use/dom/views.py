@@ -15,12 +15,6 @@ class DOMBaseNode:
 	# Use None as default and set parent later to avoid circular reference issues
 	parent: Optional['DOMElementNode']
 
-
-@dataclass(frozen=False)
-class DOMTextNode(DOMBaseNode):
-	text: str
-	type: str = 'TEXT_NODE'
-
 	def has_parent_with_highlight_index(self) -> bool:
 		current = self.parent
 		while current is not None:
@@ -30,6 +24,12 @@ class DOMTextNode(DOMBaseNode):
 		return False
 
 
+@dataclass(frozen=False)
+class DOMTextNode(DOMBaseNode):
+	text: str
+	type: str = 'TEXT_NODE'
+
+
 @dataclass(frozen=False)
 class DOMElementNode(DOMBaseNode):
 	"""
@@ -88,7 +88,7 @@ class DOMElementNode(DOMBaseNode):
 			# Skip this branch if we hit a highlighted element (except for the current node)
 			if (
 				isinstance(node, DOMElementNode)
-				and node != self
+				and node is not self
 				and node.highlight_index is not None
 			):
 				return
@@ -102,35 +102,39 @@ class DOMElementNode(DOMBaseNode):
 		collect_text(self, 0)
 		return '\n'.join(text_parts).strip()
 
-	def clickable_elements_to_string(self, include_attributes: list[str] = []) -> str:
+	def clickable_elements_to_string(self, include_attributes: tuple[str, ...] = ()) -> str:
 		"""Convert the processed DOM content to HTML."""
 		formatted_text = []
+		include_attributes_set = set(include_attributes)
 
-		def process_node(node: DOMBaseNode, depth: int) -> None:
+		# single pass over the tree: whether a node is inside a highlighted element is passed down
+		# instead of walking up the parents of every text node
+		def process_node(node: DOMBaseNode, has_highlighted_parent: bool) -> None:
 			if isinstance(node, DOMElementNode):
 				# Add element with highlight_index
 				if node.highlight_index is not None:
 					attributes_str = ''
-					if include_attributes:
+					if include_attributes_set:
 						attributes_str = ' ' + ' '.join(
 							f'{key}="{value}"'
 							for key, value in node.attributes.items()
-							if key in include_attributes
+							if key in include_attributes_set
 						)
 					formatted_text.append(
 						f'{node.highlight_index}[:]<{node.tag_name}{attributes_str}>{node.get_all_text_till_next_clickable_element()}</{node.tag_name}>'
 					)
+					has_highlighted_parent = True
 
 				# Process children regardless
 				for child in node.children:
-					process_node(child, depth + 1)
+					process_node(child, has_highlighted_parent)
 
 			elif isinstance(node, DOMTextNode):
 				# Add text only if it doesn't have a highlighted parent
-				if not node.has_parent_with_highlight_index():
+				if not has_highlighted_parent:
 					formatted_text.append(f'_[:]{node.text}')
 
-		process_node(self, 0)
+		process_node(self, self.has_parent_with_highlight_index())
 		return '\n'.join(formatted_text)
 
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']: